@@ -8,7 +8,6 @@ sudo apt-get install git bison make g++ devscripts g++-multilib cmake python-pip
 ############################
 
 pip install --upgrade pip --user
-pip install acor --user
 pip install tqdm --user
 
 echo "Install carma_pack"
@@ -15,7 +15,6 @@ sudo port install py27-gnureadline
 sudo port install py27-numpy
 sudo port install py27-scipy
 sudo port install py27-matplotlib
-sudo port install py27-acor
 sudo port install armadillo
 sudo port install py27-tqdm
 ############################
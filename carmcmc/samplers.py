@@ -7,7 +7,102 @@ __author__ = 'Brandon C. Kelly'
 import numpy as np
 from matplotlib import pyplot as plt
 import scipy.stats
-import acor
+import scipy.ndimage
+import scipy.signal
+try:
+    from numba import njit
+    _HAVE_NUMBA = True
+except ImportError:
+    _HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        return lambda f: f
+
+
+def _acf_fft(traces):
+    """
+    Compute the normalized autocorrelation functions of the columns of a 2-d trace for all non-negative lags, all at
+    once using the FFT. The traces are zero-padded to the next power of two at least twice their length to avoid
+    circular wrap-around. The standard (biased) estimator is used, i.e., the autocovariance at each lag is divided by
+    the number of samples, so that the autocorrelation function never exceeds unity.
+
+    :param traces: The parameter traces, a (nsamples, ncolumns) numpy array. A 1-d trace is treated as a single
+        column.
+    :return: The autocorrelation functions for lags 0, 1, ..., nsamples - 1, a (nsamples, ncolumns) numpy array
+        normalized to unity at zero lag.
+    """
+    traces = np.atleast_2d(traces.T).T
+    x = traces - traces.mean(axis=0)
+    n = x.shape[0]
+    m = 1 << int(np.ceil(np.log2(2 * n)))
+    F = np.fft.rfft(x, n=m, axis=0)
+    acf = np.fft.irfft(F * F.conj(), n=m, axis=0)[:n]
+    return acf / acf[0]
+
+
+def _autocorr_timescale_fft(traces, c=5.0):
+    """
+    Estimate the integrated autocorrelation time scale of each column of a 2-d trace. The autocorrelation functions
+    of all columns are computed at once with the FFT, and the time scale is estimated using Sokal's automatic
+    windowing procedure, i.e., the autocorrelation function is summed up to the smallest lag k such that
+    k >= c * tau(k).
+
+    :param traces: The parameter traces, a (nsamples, ncolumns) numpy array.
+    :param c: The window size, in units of the autocorrelation time scale.
+    :return: The autocorrelation time scales, a numpy array of length ncolumns.
+    """
+    return _sokal_timescale(_acf_fft(traces), c)
+
+
+@njit(cache=True, fastmath=True)
+def _tau_direct(x, max_lag, c=5.0):
+    """
+    Estimate the integrated autocorrelation time scale of a 1-d trace by direct summation, using Sokal's automatic
+    windowing procedure. The autocorrelation at each lag is accumulated in a single fused loop, without temporary
+    arrays, and the summation stops as soon as the window is reached. The autocorrelation is normalized as in
+    _acf_fft, using the global mean and the zero-lag autocovariance, so that both estimators agree.
+
+    :param x: The trace, a contiguous 1-d numpy array of floats.
+    :param max_lag: The maximum lag to consider.
+    :param c: The window size, in units of the autocorrelation time scale.
+    :return: The autocorrelation time scale, or -1 if the window is not reached before max_lag.
+    """
+    n = x.size
+    mean = 0.0
+    for j in range(n):
+        mean += x[j]
+    mean /= n
+    c0 = 0.0
+    for j in range(n):
+        c0 += (x[j] - mean) * (x[j] - mean)
+    if c0 <= 0.0:
+        return -1.0
+    tau = 1.0
+    for k in range(1, max_lag):
+        ck = 0.0
+        for j in range(n - k):
+            ck += (x[j] - mean) * (x[j + k] - mean)
+        tau += 2.0 * ck / c0
+        if k >= c * tau:
+            return tau
+    return -1.0
+
+
+def _sokal_timescale(acf, c=5.0):
+    """
+    Estimate the integrated autocorrelation time scale from autocorrelation functions using Sokal's automatic
+    windowing procedure.
+
+    :param acf: The normalized autocorrelation functions, a (nlags, ncolumns) numpy array.
+    :param c: The window size, in units of the autocorrelation time scale.
+    :return: The autocorrelation time scales, a numpy array of length ncolumns.
+    """
+    nlags, ncol = acf.shape
+    tau = 2.0 * np.cumsum(acf, axis=0) - 1.0
+    window = np.arange(nlags)[:, np.newaxis] >= c * tau
+    # If the window condition is never met, fall back on the sum over all lags
+    k = np.where(window.any(axis=0), np.argmax(window, axis=0), nlags - 1)
+    return tau[k, np.arange(ncol)]
 
 
 class MCMCSample(object):
@@ -34,6 +129,7 @@ class MCMCSample(object):
         :param filename: A string giving the name of an asciifile containing the MCMC samples.
         """
         self._samples = dict()  # Empty dictionary. We will place the samples for each tracked parameter here.
+        self._tau_cache = dict()  # Autocorrelation time scales already computed, keyed by parameter name.
 
         if logpost is not None:
             self.set_logpost(logpost)
@@ -54,34 +150,90 @@ class MCMCSample(object):
         """
         return self._samples[name].copy()
 
+    def get_samples_view(self, name):
+        """
+        Returns a read-only view of the numpy array containing the samples for a parameter. Unlike get_samples, this
+        does not copy the samples, and is therefore preferred when the samples only need to be read.
+
+        :param name: The name of the parameter for which the samples are desired.
+        """
+        v = self._samples[name].view()
+        v.flags.writeable = False
+        return v
+
     def generate_from_file(self, filename):
         """
         Build the dictionary of parameter samples from an ascii file of MCMC samples. The first line of this file
-        should contain the parameter names.
+        should contain the parameter names, one per column.
 
         :param filename: The name of the file containing the MCMC samples.
         """
         # TODO: put in exceptions to make sure files are ready correctly
         for fname in filename:
-            file = open(fname, 'r')
-            name = file.readline()
-            # Grab the MCMC output
-            trace = np.genfromtxt(fname, skip_header=1)
-            if name not in self._samples:
-                # Parameter is not already in the dictionary, so add it. Otherwise do nothing.
-                self._samples[name] = trace
+            with open(fname, 'r') as f:
+                names = f.readline().split()
+                # Grab the MCMC output, reading the file only once
+                trace = np.loadtxt(f, dtype=np.float64, ndmin=2)
+            for j, name in enumerate(names):
+                # Parameter is not already in the dictionary, so add it. Otherwise do nothing. The samples are kept
+                # as a (nsamples, 1) array, the layout expected by the plotting methods.
+                self._samples.setdefault(name, trace[:, j:j + 1])
 
     def autocorr_timescale(self, trace):
         """
-        Compute the autocorrelation time scale as estimated by the `acor` module.
+        Compute the autocorrelation time scale of each column of the trace, using Sokal's automatic windowing. Short
+        traces use a direct estimator compiled with numba when it is available, otherwise an FFT-based estimate of
+        the autocorrelation function is used.
+
+        :param trace: The parameter trace, a 1-d numpy array or a 2-d numpy array with one column per element.
+        """
+        trace = np.atleast_2d(trace.T).T  # A 1-d trace is treated as a single column, without copying it
+        trace_real = trace.real  # Only the real part is used for complex-valued traces
+        # For short traces the direct estimator is cheaper than the FFT, provided it is compiled with numba. It is
+        # skipped when the lag budget is too small to plausibly reach the window, since it would then almost always
+        # fall back on the FFT.
+        n = trace.shape[0]
+        max_lag = min(n - 1, 10 ** 7 // max(n, 1))
+        if _HAVE_NUMBA and max_lag > 1 and max_lag >= min(n - 1, 500):
+            acors = np.array([_tau_direct(np.ascontiguousarray(trace_real[:, i], dtype=np.float64), max_lag)
+                              for i in range(trace.shape[1])])
+            # Use the FFT for the columns whose window was not reached within max_lag
+            missing = acors < 0
+            if missing.any():
+                acors[missing] = _autocorr_timescale_fft(trace_real[:, missing])
+        else:
+            acors = _autocorr_timescale_fft(trace_real)
+        return acors
+
+    def _tau(self, name):
+        """
+        Return the autocorrelation time scale of each element of a parameter. The result is cached per parameter, so
+        that plotting and summarizing the same parameter only run the estimator once. The cache entry is recomputed if
+        the samples of the parameter have been replaced.
 
-        :param trace: The parameter trace, a numpy array.
+        :param name: The parameter name.
+        """
+        acors = self._cached_tau(name)
+        if acors is not None:
+            return acors
+        traces = self.get_samples_view(name)
+        if traces.ndim > 2:
+            traces = traces.reshape(traces.shape[0], np.prod(traces.shape[1:]))
+        acors = self.autocorr_timescale(traces)
+        self._tau_cache[name] = (self._samples[name], acors)
+        return acors.copy()
+
+    def _cached_tau(self, name):
         """
-        acors = []
-        for i in range(trace.shape[1]):
-            tau, mean, sigma = acor.acor(trace[:, i].real)  # Warning, does not work with numpy.complex
-            acors.append(tau)
-        return np.array(acors)
+        Return the cached autocorrelation time scales of a parameter, or None if they have not been computed for its
+        current samples.
+
+        :param name: The parameter name.
+        """
+        cached = self._tau_cache.get(name)
+        if cached is not None and cached[0] is self._samples[name]:
+            return cached[1].copy()
+        return None
 
     def effective_samples(self, name):
         """
@@ -95,9 +247,8 @@ class MCMCSample(object):
         else:
             print("Calculating effective number of samples")
 
-        traces = self._samples[name]  # Get the sampled parameter values
-        npts = traces.shape[0]
-        timescale = self.autocorr_timescale(traces)
+        npts = self.get_samples_view(name).shape[0]
+        timescale = self._tau(name)
         return npts / timescale
 
     def plot_trace(self, name, doShow=False):
@@ -115,19 +266,16 @@ class MCMCSample(object):
             return
         else:
             print("Plotting Trace")
-            fig = plt.figure()
 
-        traces = self._samples[name]  # Get the sampled parameter values
+        traces = self.get_samples_view(name)  # Get the sampled parameter values
         ntrace = traces.shape[1]
-        spN = plt.subplot(ntrace, 1, ntrace)
-        spN.plot(traces[:,-1], ".", markersize=2)
-        spN.set_xlabel("Step")
-        spN.set_ylabel("par %d" % (ntrace-1))
-        for i in range(ntrace-1):
-            sp = plt.subplot(ntrace, 1, i+1, sharex=spN)
+        fig, axes = plt.subplots(ntrace, 1, sharex=True, squeeze=False)
+        axes = axes[:, 0]
+        for i, sp in enumerate(axes):
             sp.plot(traces[:,i], ".", markersize=2)
             sp.set_ylabel("par %d" % (i))
-            plt.setp(sp.get_xticklabels(), visible=False)
+        axes[-1].set_xlabel("Step")
+        plt.setp([sp.get_xticklabels() for sp in axes[:-1]], visible=False)
         plt.suptitle(name)
         if doShow:
             plt.show()
@@ -145,13 +293,19 @@ class MCMCSample(object):
             return
         else:
             print("Plotting 1d PDF")
-            fig = plt.figure()
 
-        traces = self._samples[name]  # Get the sampled parameter values
+        traces = self.get_samples_view(name)  # Get the sampled parameter values
         ntrace = traces.shape[1]
-        for i in range(ntrace):
-            sp = plt.subplot(ntrace, 1, i+1)
-            sp.hist(traces[:,i], bins=50, normed=True)
+        # Bin all the columns at once on uniform bins, and normalize to a probability density
+        nbins = 50
+        lo = traces.min(axis=0)
+        hi = traces.max(axis=0)
+        width = np.where(hi > lo, hi - lo, 1.0) / nbins
+        idx = np.clip(((traces - lo) / width).astype(np.intp), 0, nbins - 1)
+        fig, axes = plt.subplots(ntrace, 1, squeeze=False)
+        for i, sp in enumerate(axes[:, 0]):
+            pdf = np.bincount(idx[:, i], minlength=nbins) / (traces.shape[0] * width[i])
+            sp.bar(lo[i] + width[i] * np.arange(nbins), pdf, width=width[i], align='edge')
             sp.set_ylabel("par %d" % (i))
             if i == ntrace-1:
                 sp.set_xlabel("val")
@@ -173,17 +327,17 @@ class MCMCSample(object):
             print("WARNING: sampler does not have", name1, name2)
             return
 
-        if pindex1 >= self._samples[name1].shape[1]:
+        if pindex1 >= self.get_samples_view(name1).shape[1]:
             print("WARNING: not enough data in", name1)
             return
-        if pindex2 >= self._samples[name2].shape[1]:
+        if pindex2 >= self.get_samples_view(name2).shape[1]:
             print("WARNING: not enough data in", name2)
             return
 
         print("Plotting 2d PDF")
         fig    = plt.figure()
-        trace1 = self._samples[name1][:,pindex1]
-        trace2 = self._samples[name2][:,pindex2]
+        trace1 = self.get_samples_view(name1)[:,pindex1]
+        trace2 = self.get_samples_view(name2)[:,pindex2]
 
         # joint distribution
         axJ = fig.add_axes([0.1, 0.1, 0.7, 0.7])               # [left, bottom, width, height]
@@ -191,7 +345,9 @@ class MCMCSample(object):
         axY = fig.add_axes([0.8, 0.1, 0.125, 0.7], sharey=axJ) 
         # x histogram
         axX = fig.add_axes([0.1, 0.8, 0.7, 0.125], sharex=axJ) 
-        axJ.plot(trace1, trace2, 'ro', ms=1, alpha=0.5)  
+        # Thin the chain for the scatter plot, and rasterize it, so that rendering does not dominate for long chains
+        step = max(1, int(np.ceil(trace1.size / 20000.)))
+        axJ.plot(trace1[::step], trace2[::step], 'ro', ms=1, alpha=0.5, rasterized=True)
         axX.hist(trace1, bins=100)
         axY.hist(trace2, orientation='horizontal', bins=100)
         axJ.set_xlabel("%s %d" % (name1, pindex1))
@@ -218,29 +374,47 @@ class MCMCSample(object):
             print("WARNING: sampler does not have", name1, name2)
             return
 
-        if pindex1 >= self._samples[name1].shape[1]:
+        if pindex1 >= self.get_samples_view(name1).shape[1]:
             print("WARNING: not enough data in", name1)
             return
-        if pindex2 >= self._samples[name2].shape[1]:
+        if pindex2 >= self.get_samples_view(name2).shape[1]:
             print("WARNING: not enough data in", name2)
             return
 
         print("Plotting 2d PDF w KDE")
         fig    = plt.figure()
-        trace1 = self._samples[name1][:,pindex1].real # JIC we get something imaginary?
-        trace2 = self._samples[name2][:,pindex2].real
+        trace1 = self.get_samples_view(name1)[:,pindex1].real # JIC we get something imaginary?
+        trace2 = self.get_samples_view(name2)[:,pindex2].real
         npts = trace1.shape[0]
         kde = scipy.stats.gaussian_kde((trace1, trace2))
         bins1 = np.linspace(trace1.min(), trace1.max(), nbins)
         bins2 = np.linspace(trace2.min(), trace2.max(), nbins)
         mesh1, mesh2 = np.meshgrid(bins1, bins2)
-        hist = kde([mesh1.ravel(), mesh2.ravel()]).reshape(mesh1.shape)
-
+        # Evaluate the KDE on the grid by convolving a 2d histogram of the samples with the full (correlated) Gaussian
+        # kernel of the KDE, expressed in grid units. The histogram bins are centered on the grid points.
+        d1 = bins1[1] - bins1[0]
+        d2 = bins2[1] - bins2[0]
+        edges1 = np.linspace(bins1[0] - 0.5 * d1, bins1[-1] + 0.5 * d1, nbins + 1)
+        edges2 = np.linspace(bins2[0] - 0.5 * d2, bins2[-1] + 0.5 * d2, nbins + 1)
+        H = np.histogram2d(trace1, trace2, bins=[edges1, edges2])[0]
+        cov = kde.covariance[::-1, ::-1] / np.outer([d2, d1], [d2, d1])  # Ordered as the axes of H.T
+        half = np.minimum(np.ceil(4.0 * np.sqrt(np.diag(cov))).astype(int), nbins)
+        off2, off1 = np.meshgrid(np.arange(-half[0], half[0] + 1), np.arange(-half[1], half[1] + 1), indexing='ij')
+        icov = np.linalg.inv(cov)
+        kernel = np.exp(-0.5 * (icov[0, 0] * off2 ** 2 + 2.0 * icov[0, 1] * off2 * off1 + icov[1, 1] * off1 ** 2))
+        kernel /= kernel.sum()
+        # Clip the small negative values due to FFT round-off
+        hist = np.maximum(scipy.signal.fftconvolve(H.T, kernel, mode='same'), 0.0) / (npts * d1 * d2)
+
+        # Find the density levels enclosing the desired fractions of the probability mass
+        flat = np.sort(hist.ravel())[::-1]
+        cs = np.cumsum(flat)
+        total = cs[-1]
         clevels = []
         for frac in [0.9973, 0.9545, 0.6827]:
-            hfrac = lambda level, hist=hist, frac=frac: hist[hist>=level].sum()/hist.sum() - frac
-            level = scipy.optimize.bisect(hfrac, hist.min(), hist.max())
-            clevels.append(level)
+            idx = np.searchsorted(cs, frac * total)
+            clevels.append(flat[min(idx, flat.size - 1)])
+        clevels.sort()
 
         # joint distribution
         axJ = fig.add_axes([0.1, 0.1, 0.7, 0.7])               # [left, bottom, width, height]
@@ -248,7 +422,7 @@ class MCMCSample(object):
         axY = fig.add_axes([0.8, 0.1, 0.125, 0.7], sharey=axJ) 
         # x histogram
         axX = fig.add_axes([0.1, 0.8, 0.7, 0.125], sharex=axJ) 
-        cont = axJ.contour(mesh1, mesh2, hist, clevels, linestyles="solid", cmap=plt.cm.jet)
+        axJ.contour(mesh1, mesh2, hist, clevels, linestyles="solid", cmap=plt.cm.jet)
         axX.hist(trace1, bins=100)
         axY.hist(trace2, orientation='horizontal', bins=100)
         axJ.set_xlabel(name1 + '[' + str(pindex1) + ']')
@@ -256,21 +430,14 @@ class MCMCSample(object):
         plt.setp(axX.get_xticklabels()+axX.get_yticklabels(), visible=False)
         plt.setp(axY.get_xticklabels()+axY.get_yticklabels(), visible=False)
 
-        # Note to self: you need to set up the contours above to have
-        # the outer one first, for collections[0] to work below.
-        # 
-        # Also a note: this does not work if the outer contour is not
-        # fully connected.
+        # The stragglers are the samples outside of the outer contour, i.e., those for which the density, linearly
+        # interpolated from the grid, is below the lowest contour level.
         if doPlotStragglers:
-            outer = cont.collections[0]._paths
-            sx = []
-            sy = []
-            for i in range(npts):
-                found = [o.contains_point((trace1[i], trace2[i])) for o in outer]
-                if not (True in found):
-                    sx.append(trace1[i])
-                    sy.append(trace2[i])
-            axJ.plot(sx, sy, 'k.', ms = 1, alpha = 0.1)
+            density = scipy.ndimage.map_coordinates(hist, [(trace2 - bins2[0]) / d2, (trace1 - bins1[0]) / d1], order=1)
+            outside = density < clevels[0]
+            stragglers = np.column_stack([trace1[outside], trace2[outside]])
+            step = max(1, int(np.ceil(stragglers.shape[0] / 20000.)))
+            axJ.plot(stragglers[::step, 0], stragglers[::step, 1], 'k.', ms = 1, alpha = 0.1, rasterized=True)
         if doShow:
             plt.show()
 
@@ -288,17 +455,24 @@ class MCMCSample(object):
             print("WARNING: sampler does not have", name)
             return
         else:
-            print("Plotting autocorrelation function (this make take a while)")
-            fig = plt.figure()
+            print("Plotting autocorrelation function")
 
-        traces = self._samples[name]  # Get the sampled parameter values
-        mtrace = np.mean(traces, axis=0)
+        traces = self.get_samples_view(name)  # Get the sampled parameter values
         ntrace = traces.shape[1]
-        acorr  = self.autocorr_timescale(traces)
-
-        for i in range(ntrace):
-            sp = plt.subplot(ntrace, 1, i+1)
-            lags, acf, not_needed1, not_needed2 = plt.acorr(traces[:, i] - mtrace[i], maxlags=traces.shape[0]-1, lw=2)
+        # Compute the autocorrelation functions of all the elements at once. The time scales setting the displayed range
+        # are taken from the cache if available, otherwise they are integrated from these same functions and cached.
+        acf = _acf_fft(traces.real)
+        acorr = self._cached_tau(name)
+        if acorr is None:
+            acorr = _sokal_timescale(acf)
+            self._tau_cache[name] = (self._samples[name], acorr.copy())
+
+        fig, axes = plt.subplots(ntrace, 1, squeeze=False)
+        for i, sp in enumerate(axes[:, 0]):
+            # Only draw the lags that fall within the displayed range
+            nlags = min(int(np.ceil(acorrFac * acorr[i])) + 1, acf.shape[0])
+            sp.vlines(np.arange(nlags), 0, acf[:nlags, i], lw=2)
+            sp.axhline(y=0, c='k')
             sp.set_xlim(-0.5, acorrFac * acorr[i])
             sp.set_ylim(-0.01, 1.01)
             sp.axhline(y=0.5, c='k', linestyle='--')
@@ -328,14 +502,16 @@ class MCMCSample(object):
             print("Plotting parameter summary")
             fig = plt.figure()
 
-        traces = self._samples[name]
+        traces = self.get_samples_view(name)
         plot_title = name
+        element = 0  # Index of the plotted element, pindex is ignored for scalar parameters
         if traces.ndim > 1:
             # Parameter is array valued, grab the column corresponding to pindex
             if traces.ndim > 2:
                 # Parameter values are at least matrix-valued, reshape to a vector
                 traces = traces.reshape(traces.shape[0], np.prod(traces.shape[1:]))
             traces = traces[:, pindex]
+            element = pindex
             plot_title = name + "[" + str(pindex) + "]"
         # Modification perso 03/10/2016: Changement de titre pour certaines variables
         if name=="mu":
@@ -371,14 +547,21 @@ class MCMCSample(object):
 
         # Finally, plot the autocorrelation function of the trace
         plt.subplot(212)
-        centered_trace = traces - traces.mean()
-        lags, acf, not_needed1, not_needed2 = plt.acorr(centered_trace, maxlags=traces.size - 1, lw=2)
+        acf = _acf_fft(traces.real)  # Only the real part is used for complex-valued traces
+        # Get the autocorrelation timescale from the cache if available, otherwise integrate it from the plotted
+        # autocorrelation function. Then only draw the lags within the displayed range.
+        acf_timescale = self._cached_tau(name)
+        if acf_timescale is None:
+            acf_timescale = _sokal_timescale(acf)[0]
+        else:
+            acf_timescale = acf_timescale[element]
+        acf = acf[:, 0]
+        nlags = min(int(np.ceil(5 * acf_timescale)) + 1, acf.size)
+        plt.vlines(np.arange(nlags), 0, acf[:nlags], lw=2)
+        plt.axhline(y=0, c='k')
         plt.ylabel("ACF")
         plt.xlabel("Lag")
-
-        # Compute the autocorrelation timescale, and then reset the x-axis limits accordingly
-        acf_timescale = self.autocorr_timescale(traces[:, np.newaxis])
-        plt.xlim(0, np.min([5 * acf_timescale[0], len(traces)]))
+        plt.xlim(0, np.min([5 * acf_timescale, len(traces)]))
         # Ajout perso 02/06/2016 (+ajout de "figname" dans les inputs)
         if(figname!=""):
             plt.savefig(figname,dpi=dpi)
@@ -396,33 +579,30 @@ class MCMCSample(object):
 
         :param name: The name of the parameter for which the summaries are desired.
         """
-        traces = self._samples[name]  # Get the sampled parameter values
+        traces = self.get_samples_view(name)  # Get the sampled parameter values
         effective_nsamples = self.effective_samples(name)  # Get the effective number of independent samples
-        if traces.ndim == 1:
-            # Parameter is scalar valued, so this is easy
-            print("Posterior summary for parameter", name)
-            print("----------------------------------------------")
-            print("Effective number of independent samples:", effective_nsamples)
-            print("Median:", np.median(traces))
-            print("Standard deviation:", np.std(traces))
-            print("68% credibility interval:", np.percentile(traces, (16.0, 84.0)))
-            print("95% credibility interval:", np.percentile(traces, (2.5, 97.5)))
-            print("99% credibility interval:", np.percentile(traces, (0.5, 99.5)))
-        else:
-            if traces.ndim > 2:
-                # Parameter values are at least matrix-valued, reshape to a vector.
-                traces = traces.reshape(traces.shape[0], np.prod(traces.shape[1:]))
-            for i in range(traces.shape[1]):
-                # give summary for each element of this parameter separately
-                # Parameter is scalar valued, so this is easy
+        scalar = traces.ndim == 1
+        if scalar:
+            traces = traces[:, np.newaxis]
+        elif traces.ndim > 2:
+            # Parameter values are at least matrix-valued, reshape to a vector.
+            traces = traces.reshape(traces.shape[0], np.prod(traces.shape[1:]))
+        # Compute all the quantiles in a single pass: 0.5%, 2.5%, 16%, 50%, 84%, 97.5%, 99.5%
+        qs = np.quantile(traces, [0.005, 0.025, 0.16, 0.5, 0.84, 0.975, 0.995], axis=0)
+        stds = traces.std(axis=0)
+        for i in range(traces.shape[1]):
+            # give summary for each element of this parameter separately
+            if scalar:
+                print("Posterior summary for parameter", name)
+            else:
                 print("Posterior summary for parameter", name, " element", i)
-                print("----------------------------------------------")
-                print("Effective number of independent samples:", effective_nsamples[i])
-                print("Median:", np.median(traces[:, i]))
-                print("Standard deviation:", np.std(traces[:, i]))
-                print("68% credibility interval:", np.percentile(traces[:, i], (16.0, 84.0)))
-                print("95% credibility interval:", np.percentile(traces[:, i], (2.5, 97.5)))
-                print("99% credibility interval:", np.percentile(traces[:, i], (0.5, 99.5)))
+            print("----------------------------------------------")
+            print("Effective number of independent samples:", effective_nsamples[i])
+            print("Median:", qs[3, i])
+            print("Standard deviation:", stds[i])
+            print("68% credibility interval:", qs[[2, 4], i])
+            print("95% credibility interval:", qs[[1, 5], i])
+            print("99% credibility interval:", qs[[0, 6], i])
 
     def newaxis(self):
         for key in list(self._samples.keys()):